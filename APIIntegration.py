@@ -5,28 +5,571 @@ Fetches and displays weather data and cryptocurrency prices from external APIs
 Handles errors gracefully and provides user-friendly output
 """
 
-import requests
+import argparse
+import asyncio
+import contextvars
+import itertools
 import json
+import logging
+import os
+import random
+import re
+import socket
+import sys
+import threading
+import time
+from collections import OrderedDict, defaultdict, deque
 from datetime import datetime
+from functools import lru_cache
+from operator import itemgetter
+from time import perf_counter_ns
+from urllib.parse import urlencode
+
+import httpx
+
+try:
+    # C extension; several times faster than the stdlib parser on float-heavy payloads
+    from orjson import loads as json_loads
+except ImportError:
+    json_loads = json.loads
+
+try:
+    # Incremental parser, used to decode large CoinGecko bodies as they arrive
+    import ijson
+except ImportError:
+    ijson = None
+
+try:
+    # SQLite-backed cache, lets cached responses survive restarts of the script
+    import diskcache
+except ImportError:
+    diskcache = None
+
+try:
+    # libuv-based event loop; speeds up the gather/fan-out paths (not available on Windows)
+    import uvloop
+except ImportError:
+    uvloop = None
+
+try:
+    # httpx only speaks HTTP/2 when the optional h2 package is installed
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# Id of the logical API call in progress, shared by all of its retry attempts
+request_id = contextvars.ContextVar('request_id', default=None)
+
+@lru_cache(maxsize=1024)
+def format_timestamp(dt):
+    """Format a Unix timestamp in local time; cached since repeat queries share dt"""
+    return datetime.fromtimestamp(dt).isoformat(sep=' ', timespec='seconds')
+
+class DNSCache:
+    """
+    Pin getaddrinfo answers for a fixed set of hosts for ttl seconds
+    
+    While installed it wraps socket.getaddrinfo, which the default asyncio loop
+    uses to resolve names for new connections; other hosts pass straight
+    through. uvloop resolves through libuv instead, so there it has no effect.
+    Lookups run in executor threads, hence the lock around the answers.
+    
+    The patch is process-wide: install() and uninstall() are reference-counted,
+    and only one DNSCache may be installed at a time.
+    """
+    
+    # The DNSCache currently patched into socket.getaddrinfo, if any
+    _installed = None
+    
+    def __init__(self, hosts, ttl=300):
+        self.hosts = frozenset(hosts)
+        self.ttl = ttl
+        self._answers = {}
+        self._lock = threading.Lock()
+        self._real_getaddrinfo = None
+        self._installs = 0
+    
+    @staticmethod
+    def _normalize(host):
+        """Return host as a lowercase str; anyio passes it IDNA-encoded as bytes"""
+        if isinstance(host, (bytes, bytearray)):
+            host = host.decode('idna')
+        return host.lower() if isinstance(host, str) else host
+    
+    def getaddrinfo(self, host, port, *args, **kwargs):
+        """Drop-in replacement for socket.getaddrinfo that caches pinned hosts"""
+        name = self._normalize(host)
+        if name not in self.hosts:
+            return self._real_getaddrinfo(host, port, *args, **kwargs)
+        key = (name, port, args, tuple(sorted(kwargs.items())))
+        with self._lock:
+            entry = self._answers.get(key)
+        if entry is not None and time.monotonic() < entry[0]:
+            return entry[1]
+        answer = self._real_getaddrinfo(host, port, *args, **kwargs)
+        with self._lock:
+            self._answers[key] = (time.monotonic() + self.ttl, answer)
+        return answer
+    
+    def invalidate(self, host):
+        """Forget cached answers for host, e.g. after failing to connect to it"""
+        name = self._normalize(host)
+        with self._lock:
+            for key in [key for key in self._answers if key[0] == name]:
+                del self._answers[key]
+    
+    def install(self):
+        """Start routing socket.getaddrinfo through this cache"""
+        with self._lock:
+            if DNSCache._installed not in (None, self):
+                raise RuntimeError("another DNSCache is already installed")
+            if self._installs == 0:
+                self._real_getaddrinfo = socket.getaddrinfo
+                socket.getaddrinfo = self.getaddrinfo
+                DNSCache._installed = self
+            self._installs += 1
+    
+    def uninstall(self):
+        """Undo one install(), restoring socket.getaddrinfo after the last one"""
+        with self._lock:
+            if self._installs == 0:
+                return
+            self._installs -= 1
+            if self._installs == 0:
+                socket.getaddrinfo = self._real_getaddrinfo
+                self._real_getaddrinfo = None
+                DNSCache._installed = None
+
+# Shared by every APIIntegration since it patches socket.getaddrinfo process-wide
+dns_cache = DNSCache(['api.openweathermap.org', 'api.coingecko.com'])
+
+class CallMetrics:
+    """Per-host call counters plus a ring buffer of recent attempt latencies"""
+    
+    def __init__(self, window=1024):
+        self.count = 0
+        self.errors = 0
+        self._latencies_ns = deque(maxlen=window)
+    
+    def record(self, elapsed_ns, ok):
+        """Record one attempt's latency and whether it succeeded"""
+        self.count += 1
+        if not ok:
+            self.errors += 1
+        self._latencies_ns.append(elapsed_ns)
+    
+    def snapshot(self):
+        """Return counts, error rate and p50/p95/p99 latency in milliseconds"""
+        latencies = sorted(self._latencies_ns)
+        
+        def percentile(q):
+            if not latencies:
+                return None
+            return latencies[min(len(latencies) - 1, round(q * (len(latencies) - 1)))] / 1e6
+        
+        return {
+            'count': self.count,
+            'errors': self.errors,
+            'error_rate': self.errors / self.count if self.count else 0.0,
+            'p50_ms': percentile(0.50),
+            'p95_ms': percentile(0.95),
+            'p99_ms': percentile(0.99)
+        }
+
+class TTLCache:
+    """
+    Small LRU cache whose entries expire after a per-entry TTL
+    
+    Entries live in memory unless a diskcache store is given, in which case
+    they are kept there under (namespace, key) and survive process restarts.
+    maxsize only bounds the in-memory cache; a disk store is bounded by its own
+    size_limit. From the event loop use aget/aset, which keep SQLite access off
+    the loop thread.
+    """
+    
+    def __init__(self, maxsize, ttl, store=None, namespace=None, stale_ttl=86400):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.namespace = namespace
+        # How long expired entries stay available to allow_stale lookups on disk
+        self.stale_ttl = stale_ttl
+        self._store = store
+        self._entries = OrderedDict()
+    
+    def get(self, key, allow_stale=False):
+        """
+        Return the cached value for key, or None if missing or expired
+        
+        Expired entries are kept until evicted so that allow_stale=True can
+        still return them when the upstream API is unavailable.
+        """
+        if self._store is not None:
+            entry = self._store.get((self.namespace, key), default=None, retry=True)
+        else:
+            entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if time.time() >= expires_at and not allow_stale:
+            return None
+        if self._store is None:
+            self._entries.move_to_end(key)
+        return value
+    
+    async def aget(self, key, allow_stale=False):
+        """Like get, but runs disk store lookups in a worker thread"""
+        if self._store is None:
+            return self.get(key, allow_stale)
+        return await asyncio.to_thread(self.get, key, allow_stale)
+    
+    async def aset(self, key, value, ttl=None):
+        """Like set, but runs disk store writes in a worker thread"""
+        if self._store is None:
+            return self.set(key, value, ttl)
+        return await asyncio.to_thread(self.set, key, value, ttl)
+    
+    def set(self, key, value, ttl=None):
+        """Store value under key for ttl seconds (defaults to the cache TTL)"""
+        ttl = self.ttl if ttl is None else ttl
+        entry = (time.time() + ttl, value)
+        if self._store is not None:
+            self._store.set((self.namespace, key), entry, expire=ttl + self.stale_ttl, retry=True)
+            return
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+def cache_ttl(response, default):
+    """Return the Cache-Control max-age of a response, falling back to default"""
+    match = re.search(r'max-age=(\d+)', response.headers.get('Cache-Control', ''))
+    return int(match.group(1)) if match else default
+
+# Failures worth retrying: the request may well succeed if sent again
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+RETRY_EXCEPTIONS = (httpx.TimeoutException, httpx.NetworkError, httpx.RemoteProtocolError)
+
+# Where cached responses persist between runs when diskcache is installed
+CACHE_DIR = os.path.expanduser('~/.cache/api_integration')
+# Generous bound on one pickled response, used to size the disk store from maxsize
+CACHE_ENTRY_BYTES = 16 * 1024
+
+# Symbol counts above this stream the CoinGecko response instead of buffering it
+CRYPTO_STREAM_THRESHOLD = 4
+
+def retry_after_seconds(response):
+    """Return the Retry-After delay of a response in seconds, or None if absent"""
+    value = response.headers.get('Retry-After', '')
+    return int(value) if value.isdigit() else None
+
+class DeadlineExceededError(httpx.TimeoutException):
+    """Raised when the deadline passed before any attempt could be sent"""
+
+class CircuitOpenError(Exception):
+    """Raised when a request is refused because its circuit breaker is open"""
+
+class CircuitBreaker:
+    """
+    Fail fast against an upstream that keeps failing
+    
+    After failure_threshold consecutive failures the breaker opens and refuses
+    requests for recovery_timeout seconds. It then lets a single probe through
+    (HALF_OPEN); the probe's outcome closes or re-opens the breaker.
+    """
+    
+    def __init__(self, failure_threshold=5, recovery_timeout=30):
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.state = 'CLOSED'
+        self.failure_count = 0
+        self.opened_at = None
+    
+    def allow_request(self):
+        """Return True if a request may be sent now"""
+        if self.state == 'OPEN':
+            if time.monotonic() - self.opened_at < self.recovery_timeout:
+                return False
+            self.state = 'HALF_OPEN'
+            return True
+        # In HALF_OPEN the single probe is already in flight
+        return self.state == 'CLOSED'
+    
+    def record_success(self):
+        """Close the breaker after a successful call"""
+        self.state = 'CLOSED'
+        self.failure_count = 0
+        self.opened_at = None
+    
+    def record_failure(self):
+        """Count a failed call, opening the breaker once the threshold is reached"""
+        self.failure_count += 1
+        if self.state == 'HALF_OPEN' or self.failure_count >= self.failure_threshold:
+            self.state = 'OPEN'
+            self.opened_at = time.monotonic()
+    
+    def abort_probe(self):
+        """Re-open a HALF_OPEN breaker whose probe ended without an upstream verdict"""
+        if self.state == 'HALF_OPEN':
+            self.state = 'OPEN'
+            self.opened_at = time.monotonic()
+
+class BulkheadFullError(Exception):
+    """Raised when a request waited too long for a free slot in its bulkhead"""
+
+class Bulkhead:
+    """
+    Bound the number of concurrent calls to one upstream
+    
+    Callers beyond max_concurrent wait up to queue_timeout seconds for a slot
+    and are then rejected with BulkheadFullError instead of piling up.
+    """
+    
+    def __init__(self, max_concurrent, queue_timeout=2.0):
+        self.max_concurrent = max_concurrent
+        self.queue_timeout = queue_timeout
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+        self.in_flight = 0
+        self.queued = 0
+        self.rejected = 0
+    
+    async def __aenter__(self):
+        self.queued += 1
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            self.rejected += 1
+            raise BulkheadFullError(f"no free slot after {self.queue_timeout}s") from None
+        finally:
+            self.queued -= 1
+        self.in_flight += 1
+        return self
+    
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        self.in_flight -= 1
+        self._semaphore.release()
+    
+    def stats(self):
+        """Return the current in-flight, queued and rejected counters"""
+        return {'in_flight': self.in_flight, 'queued': self.queued, 'rejected': self.rejected}
 
 class APIIntegration:
     """Main class for handling API integrations"""
     
-    def __init__(self):
+    # Built once; pulls all temperature/pressure fields in a single C-level call
+    _main_keys = itemgetter('temp', 'feels_like', 'humidity', 'pressure')
+    
+    def __init__(self, use_cache=True, cache_dir=CACHE_DIR):
         self.weather_api_key = "demo_key"  # Replace with actual API key
         self.weather_base_url = "http://api.openweathermap.org/data/2.5/weather"
         self.crypto_base_url = "https://api.coingecko.com/api/v3"
         
-    def fetch_weather_data(self, city_name):
+        # Shared async client, created in __aenter__ so it binds to the running loop
+        self._client = None
+        
+        # Isolated capacity per upstream so a slow API can't starve the other
+        self._bulkheads = {'weather': Bulkhead(4), 'crypto': Bulkhead(8)}
+        # Batches queue here instead of being rejected by the weather bulkhead
+        self._weather_batch_limit = asyncio.Semaphore(self._bulkheads['weather'].max_concurrent)
+        
+        # Weather changes over minutes, prices over seconds
+        self.use_cache = use_cache
+        self._cache_store = None
+        cache_maxsize = 256
+        if use_cache and diskcache is not None:
+            try:
+                # Shared by both caches, so room for maxsize entries of each
+                self._cache_store = diskcache.Cache(cache_dir, size_limit=2 * cache_maxsize * CACHE_ENTRY_BYTES)
+            except Exception as e:
+                print(f"Warning: Persistent cache unavailable, using memory only ({e})")
+        self._weather_cache = TTLCache(maxsize=cache_maxsize, ttl=300, store=self._cache_store, namespace='weather')
+        self._crypto_cache = TTLCache(maxsize=cache_maxsize, ttl=30, store=self._cache_store, namespace='crypto')
+        
+        # Fully encoded CoinGecko price URLs, keyed by sorted symbol tuple
+        self._crypto_url_cache = {}
+        
+        # Attempt latencies and outcomes per host, for tuning timeouts and retries
+        self._metrics = defaultdict(CallMetrics)
+        self._request_ids = itertools.count(1)
+        
+        # Skip the resolver on new connections to our two API hosts
+        self._dns_cache = dns_cache
+        self._dns_pinned = False
+        
+        # One breaker per upstream so an outage of one API doesn't block the other
+        self._breakers = {'weather': CircuitBreaker(), 'crypto': CircuitBreaker()}
+    
+    async def aclose(self):
+        """Close the underlying HTTP client and its pooled connections"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+        if self._dns_pinned:
+            self._dns_cache.uninstall()
+            self._dns_pinned = False
+        if self._cache_store is not None:
+            self._cache_store.close()
+    
+    async def __aenter__(self):
+        # uvloop resolves through libuv, out of reach of the socket.getaddrinfo patch
+        if uvloop is None or not isinstance(asyncio.get_running_loop(), uvloop.Loop):
+            self._dns_cache.install()
+            self._dns_pinned = True
+        # HTTP/2 multiplexes concurrent CoinGecko calls over a single TLS connection
+        self._client = httpx.AsyncClient(
+            http2=HTTP2_AVAILABLE,
+            headers={'User-Agent': 'API-Integration/1.0'},
+            limits=httpx.Limits(max_keepalive_connections=16, max_connections=32),
+            timeout=httpx.Timeout(5.0, connect=3.05)
+        )
+        return self
+    
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.aclose()
+        
+    async def _guarded_request(self, service, method, url, **kwargs):
+        """
+        Send a request through the bulkhead and circuit breaker of the given service
+        
+        Raises BulkheadFullError if no slot frees up in time, and CircuitOpenError
+        without touching the network while the breaker is open. Retryable status
+        codes and exceptions count as breaker failures; cancellation and local
+        errors do not, though they end a HALF_OPEN probe.
+        """
+        async with self._bulkheads[service]:
+            breaker = self._breakers[service]
+            if not breaker.allow_request():
+                raise CircuitOpenError(service)
+            
+            token = request_id.set(next(self._request_ids))
+            try:
+                response = await self._request_with_retry(method, url, **kwargs)
+            except DeadlineExceededError:
+                # Nothing reached the upstream, so there is nothing to hold against it
+                breaker.abort_probe()
+                raise
+            except RETRY_EXCEPTIONS:
+                breaker.record_failure()
+                raise
+            except BaseException:
+                breaker.abort_probe()
+                raise
+            finally:
+                request_id.reset(token)
+            
+            if response.status_code in RETRY_STATUS_CODES:
+                breaker.record_failure()
+            else:
+                breaker.record_success()
+            return response
+    
+    async def _request_with_retry(self, method, url, deadline, per_try_timeout=4.0,
+                                  max_attempts=4, base=0.2, cap=8.0, consume=None, **kwargs):
+        """
+        Send a request, retrying transient failures with full-jitter exponential backoff
+        
+        Only timeouts, network errors, 429 and 5xx responses are retried; any other
+        response is returned as-is. Each attempt, body included, is cut off after
+        min(per_try_timeout, time left before deadline), where deadline is a
+        time.monotonic() value, and no retry is started that could not finish in time. When attempts or time run out the final
+        response is returned or the final exception re-raised.
+        DeadlineExceededError means no attempt was sent at all.
+        
+        With consume set the body is streamed: a 200 response is handed to
+        await consume(response), which must read and close it, as part of the
+        attempt so that a failure midway through the body is retried like any
+        other. Any other response is read in full first.
+        """
+        host = httpx.URL(url).host
+        response = error = None
+        for attempt in range(max_attempts):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            attempt_timeout = min(per_try_timeout, remaining)
+            timeout = httpx.Timeout(attempt_timeout, connect=min(3.05, remaining))
+            ok = False
+            started = perf_counter_ns()
+            try:
+                request = self._client.build_request(method, url, timeout=timeout, **kwargs)
+                try:
+                    # httpx timeouts apply per phase and per read; this bounds the attempt as a whole
+                    response = await asyncio.wait_for(self._send(request, consume), attempt_timeout)
+                except asyncio.TimeoutError:
+                    raise httpx.TimeoutException(f"Attempt exceeded {attempt_timeout:.2f}s",
+                                                 request=request) from None
+                ok = response.status_code not in RETRY_STATUS_CODES
+                error = None
+            except RETRY_EXCEPTIONS as exc:
+                response, error = None, exc
+                if isinstance(exc, httpx.ConnectError):
+                    # The pinned address may be stale; resolve afresh next time
+                    self._dns_cache.invalidate(host)
+            except BaseException as exc:
+                # Log this attempt's failure rather than the previous attempt's outcome
+                response, error = None, exc
+                raise
+            finally:
+                elapsed_ns = perf_counter_ns() - started
+                # Created on first use so hosts with no attempts don't show up in metrics
+                self._metrics[host].record(elapsed_ns, ok)
+                logger.debug("request %s attempt %d %s %s: %s in %.1f ms", request_id.get(), attempt + 1,
+                             method, url, response.status_code if response is not None else error,
+                             elapsed_ns / 1e6)
+            if ok:
+                return response
+            
+            if attempt == max_attempts - 1:
+                break
+            delay = random.uniform(0, min(cap, base * 2 ** attempt))
+            retry_after = retry_after_seconds(response) if response is not None and response.status_code == 429 else None
+            if retry_after is not None:
+                delay = min(cap, retry_after)
+            if time.monotonic() + delay >= deadline:
+                break
+            await asyncio.sleep(delay)
+        
+        if response is not None:
+            return response
+        if error is not None:
+            raise error
+        raise DeadlineExceededError("Deadline exceeded before the request could be sent")
+    
+    async def _send(self, request, consume=None):
+        """Send one request attempt, reading or consuming the body when streaming"""
+        response = await self._client.send(request, stream=consume is not None)
+        if consume is None:
+            return response
+        try:
+            if response.status_code == 200:
+                await consume(response)
+            else:
+                await response.aread()
+        except BaseException:
+            await response.aclose()
+            raise
+        return response
+    
+    async def fetch_weather_data(self, city_name, budget=5.0):
         """
         Fetch weather data for a given city
         
         Args:
             city_name (str): Name of the city
+            budget (float): Total seconds allowed, including retries
             
         Returns:
             dict: Weather information or None if error
         """
+        deadline = time.monotonic() + budget
+        cache_key = city_name.lower()
+        if self.use_cache:
+            cached = await self._weather_cache.aget(cache_key)
+            if cached is not None:
+                return cached
+        
         try:
             # Build API URL
             params = {
@@ -35,166 +578,306 @@ class APIIntegration:
                 'units': 'metric'
             }
             
-            response = requests.get(self.weather_base_url, params=params, timeout=10)
+            response = await self._guarded_request('weather', 'GET', self.weather_base_url, params=params, deadline=deadline)
             
             if response.status_code == 200:
-                data = response.json()
-                
-                weather_info = {
-                    'city': data['name'],
-                    'country': data['sys']['country'],
-                    'temperature': data['main']['temp'],
-                    'feels_like': data['main']['feels_like'],
-                    'humidity': data['main']['humidity'],
-                    'pressure': data['main']['pressure'],
-                    'weather_description': data['weather'][0]['description'].title(),
-                    'wind_speed': data['wind']['speed'],
-                    'visibility': data.get('visibility', 'N/A'),
-                    'timestamp': datetime.fromtimestamp(data['dt']).strftime('%Y-%m-%d %H:%M:%S')
-                }
-                
+                weather_info = self._parse_weather(json_loads(response.content))
+                if self.use_cache:
+                    await self._weather_cache.aset(cache_key, weather_info,
+                                                   ttl=cache_ttl(response, self._weather_cache.ttl))
                 return weather_info
             else:
                 print(f"Error: Unable to fetch weather data (Status code: {response.status_code})")
                 return None
                 
-        except requests.exceptions.Timeout:
+        except CircuitOpenError:
+            print("Error: Weather API is unavailable, retrying later. Showing last known data if any.")
+            return await self._weather_cache.aget(cache_key, allow_stale=True)
+        except BulkheadFullError:
+            print("Error: Too many weather requests in progress. Please try again shortly.")
+            return None
+        except httpx.TimeoutException:
             print("Error: Request timed out. Please check your internet connection.")
             return None
-        except requests.exceptions.ConnectionError:
+        except httpx.ConnectError:
             print("Error: Failed to connect to weather API. Please check your internet connection.")
             return None
         except Exception as e:
             print(f"Error: {str(e)}")
             return None
     
-    def fetch_crypto_prices(self, crypto_symbols):
+    async def fetch_weather_many(self, cities):
         """
-        Fetch cryptocurrency prices
+        Fetch weather data for several cities in one parallel batch
         
         Args:
-            crypto_symbols (list): List of cryptocurrency symbols (e.g., ['bitcoin', 'ethereum'])
+            cities (list): Names of the cities
             
         Returns:
-            dict: Cryptocurrency prices or None if error
+            dict: Weather information (or None if error) keyed by city name
         """
-        try:
-            # Convert symbols to IDs for CoinGecko API
-            ids = ','.join(crypto_symbols)
-            url = f"{self.crypto_base_url}/simple/price"
-            params = {
-                'ids': ids,
+        async def fetch_limited(city_name):
+            async with self._weather_batch_limit:
+                return await self.fetch_weather_data(city_name)
+        
+        results = await asyncio.gather(*(fetch_limited(city) for city in cities))
+        return dict(zip(cities, results))
+    
+    def _parse_weather(self, data):
+        """Extract the displayed fields from an OpenWeather response body"""
+        temperature, feels_like, humidity, pressure = self._main_keys(data['main'])
+        return {
+            'city': data['name'],
+            'country': data['sys']['country'],
+            'temperature': temperature,
+            'feels_like': feels_like,
+            'humidity': humidity,
+            'pressure': pressure,
+            'weather_description': data['weather'][0]['description'].title(),
+            'wind_speed': data['wind']['speed'],
+            'visibility': data.get('visibility', 'N/A'),
+            'timestamp': format_timestamp(data['dt'])
+        }
+    
+    def _parse_coin(self, quote):
+        """Extract the displayed fields from one coin's CoinGecko price entry"""
+        get = quote.get
+        return {
+            'price': quote['usd'],
+            'change_24h': get('usd_24h_change', 0),
+            'market_cap': get('usd_market_cap', 'N/A'),
+            'volume_24h': get('usd_24h_vol', 'N/A')
+        }
+    
+    def _crypto_price_url(self, symbols):
+        """Return the CoinGecko price URL for a sorted symbol tuple, building it once"""
+        url = self._crypto_url_cache.get(symbols)
+        if url is None:
+            # Symbols are CoinGecko IDs, passed as one comma-separated list
+            query = urlencode({
+                'ids': ','.join(symbols),
                 'vs_currencies': 'usd',
                 'include_24hr_change': 'true',
                 'include_market_cap': 'true',
                 'include_24hr_vol': 'true'
-            }
+            })
+            url = self._crypto_url_cache[symbols] = f"{self.crypto_base_url}/simple/price?{query}"
+        return url
+    
+    async def _stream_crypto(self, response):
+        """Parse a streamed CoinGecko price response coin by coin, then close it"""
+        parse_coin = self._parse_coin
+        crypto_info = {}
+        coins = ijson.sendable_list()
+        parser = ijson.kvitems_coro(coins, '', use_float=True)
+        try:
+            async for chunk in response.aiter_bytes():
+                parser.send(chunk)
+                for symbol, quote in coins:
+                    crypto_info[symbol] = parse_coin(quote)
+                del coins[:]
+            parser.close()
+            for symbol, quote in coins:
+                crypto_info[symbol] = parse_coin(quote)
+        finally:
+            await response.aclose()
+        return crypto_info
+    
+    def _in_requested_order(self, crypto_symbols, crypto_info):
+        """Reorder parsed prices to follow crypto_symbols; the body and cache use their own order"""
+        if crypto_info is None:
+            return None
+        return {symbol: crypto_info[symbol] for symbol in crypto_symbols if symbol in crypto_info}
+    
+    async def fetch_crypto_prices(self, crypto_symbols, budget=5.0):
+        """
+        Fetch cryptocurrency prices
+        
+        Args:
+            crypto_symbols (list): List of cryptocurrency symbols (e.g., ['bitcoin', 'ethereum'])
+            budget (float): Total seconds allowed, including retries
             
-            response = requests.get(url, params=params, timeout=10)
+        Returns:
+            dict: Cryptocurrency prices or None if error
+        """
+        deadline = time.monotonic() + budget
+        cache_key = tuple(sorted(crypto_symbols))
+        if self.use_cache:
+            cached = await self._crypto_cache.aget(cache_key)
+            if cached is not None:
+                return self._in_requested_order(crypto_symbols, cached)
+        
+        try:
+            url = self._crypto_price_url(cache_key)
+            consume = None
+            if ijson is not None and len(cache_key) > CRYPTO_STREAM_THRESHOLD:
+                streamed = {}
+                
+                async def consume(response):
+                    # Parsed inside the request attempt, so the bulkhead, breaker and retries cover the body
+                    streamed['crypto_info'] = await self._stream_crypto(response)
+            
+            response = await self._guarded_request('crypto', 'GET', url, deadline=deadline, consume=consume)
             
             if response.status_code == 200:
-                data = response.json()
+                if consume is not None:
+                    crypto_info = streamed['crypto_info']
+                else:
+                    data = json_loads(response.content)
+                    
+                    # CoinGecko only returns the IDs we asked for, so one pass over the body suffices
+                    parse_coin = self._parse_coin
+                    crypto_info = {symbol: parse_coin(quote) for symbol, quote in data.items()}
                 
-                crypto_info = {}
-                for symbol in crypto_symbols:
-                    if symbol in data:
-                        crypto_info[symbol] = {
-                            'price': data[symbol]['usd'],
-                            'change_24h': data[symbol].get('usd_24h_change', 0),
-                            'market_cap': data[symbol].get('usd_market_cap', 'N/A'),
-                            'volume_24h': data[symbol].get('usd_24h_vol', 'N/A')
-                        }
-                
-                return crypto_info
+                if self.use_cache:
+                    await self._crypto_cache.aset(cache_key, crypto_info,
+                                                  ttl=cache_ttl(response, self._crypto_cache.ttl))
+                return self._in_requested_order(crypto_symbols, crypto_info)
             else:
                 print(f"Error: Unable to fetch crypto data (Status code: {response.status_code})")
                 return None
                 
-        except requests.exceptions.Timeout:
+        except CircuitOpenError:
+            print("Error: Crypto API is unavailable, retrying later. Showing last known data if any.")
+            return self._in_requested_order(crypto_symbols,
+                                            await self._crypto_cache.aget(cache_key, allow_stale=True))
+        except BulkheadFullError:
+            print("Error: Too many crypto requests in progress. Please try again shortly.")
+            return None
+        except httpx.TimeoutException:
             print("Error: Request timed out. Please check your internet connection.")
             return None
-        except requests.exceptions.ConnectionError:
+        except httpx.ConnectError:
             print("Error: Failed to connect to crypto API. Please check your internet connection.")
             return None
         except Exception as e:
             print(f"Error: {str(e)}")
             return None
     
+    def metrics_snapshot(self):
+        """Return the call metrics recorded so far, keyed by host"""
+        return {host: metrics.snapshot() for host, metrics in self._metrics.items()}
+    
+    def display_metrics(self, snapshot):
+        """Display per-host call metrics in a user-friendly format"""
+        if not snapshot:
+            return
+        
+        lines = ["", "="*50, "API CALL METRICS", "="*50]
+        for host, stats in snapshot.items():
+            lines.append(f"\n{host}:")
+            latencies = " / ".join('n/a' if stats[key] is None else f"{stats[key]:.0f}"
+                                   for key in ('p50_ms', 'p95_ms', 'p99_ms'))
+            lines.append(f"  Attempts: {stats['count']} ({stats['errors']} failed, {stats['error_rate']:.0%})")
+            lines.append(f"  Latency p50/p95/p99: {latencies} ms")
+        
+        sys.stdout.write("\n".join(lines) + "\n")
+    
     def display_weather(self, weather_data):
         """Display weather data in a user-friendly format"""
         if not weather_data:
             return
             
-        print("\n" + "="*50)
-        print("🌤️  WEATHER INFORMATION")
-        print("="*50)
-        print(f"Location: {weather_data['city']}, {weather_data['country']}")
-        print(f"Temperature: {weather_data['temperature']}°C")
-        print(f"Feels Like: {weather_data['feels_like']}°C")
-        print(f"Description: {weather_data['weather_description']}")
-        print(f"Humidity: {weather_data['humidity']}%")
-        print(f"Pressure: {weather_data['pressure']} hPa")
-        print(f"Wind Speed: {weather_data['wind_speed']} m/s")
-        print(f"Visibility: {weather_data['visibility']} meters")
-        print(f"Last Updated: {weather_data['timestamp']}")
+        # Build the whole panel first so it goes out in a single write
+        lines = [
+            "",
+            "="*50,
+            "🌤️  WEATHER INFORMATION",
+            "="*50,
+            f"Location: {weather_data['city']}, {weather_data['country']}",
+            f"Temperature: {weather_data['temperature']}°C",
+            f"Feels Like: {weather_data['feels_like']}°C",
+            f"Description: {weather_data['weather_description']}",
+            f"Humidity: {weather_data['humidity']}%",
+            f"Pressure: {weather_data['pressure']} hPa",
+            f"Wind Speed: {weather_data['wind_speed']} m/s",
+            f"Visibility: {weather_data['visibility']} meters",
+            f"Last Updated: {weather_data['timestamp']}"
+        ]
+        sys.stdout.write("\n".join(lines) + "\n")
     
     def display_crypto_prices(self, crypto_data):
         """Display cryptocurrency prices in a user-friendly format"""
         if not crypto_data:
             return
             
-        print("\n" + "="*50)
-        print("CRYPTOCURRENCY PRICES")
-        print("="*50)
+        parts = ["\n" + "="*50 + "\nCRYPTOCURRENCY PRICES\n" + "="*50 + "\n"]
         
+        # One straight-line template per coin; only the optional fields branch
         for symbol, data in crypto_data.items():
-            print(f"\n{symbol.upper()}:")
-            print(f"  Price: ${data['price']:,.2f}")
-            print(f"  24h Change: {data['change_24h']:+.2f}%")
-            if data['market_cap'] != 'N/A':
-                print(f"  Market Cap: ${data['market_cap']:,.0f}")
-            if data['volume_24h'] != 'N/A':
-                print(f"  24h Volume: ${data['volume_24h']:,.0f}")
-
-def main():
+            market_cap, volume = data['market_cap'], data['volume_24h']
+            parts.append(
+                f"\n{symbol.upper()}:\n"
+                f"  Price: ${data['price']:,.2f}\n"
+                f"  24h Change: {data['change_24h']:+.2f}%\n"
+                + (f"  Market Cap: ${market_cap:,.0f}\n" if market_cap != 'N/A' else "")
+                + (f"  24h Volume: ${volume:,.0f}\n" if volume != 'N/A' else "")
+            )
+        
+        sys.stdout.write("".join(parts))
+
+def parse_cities(text):
+    """Split a comma-separated list of city names, dropping blanks and duplicates"""
+    return list(dict.fromkeys(city.strip() for city in text.split(',') if city.strip()))
+
+def parse_args():
+    """Parse command-line options"""
+    parser = argparse.ArgumentParser(description="Fetch weather data and cryptocurrency prices")
+    parser.add_argument('--no-cache', action='store_true',
+                        help="always fetch fresh data instead of reusing recent responses")
+    return parser.parse_args()
+
+async def main():
     """Main function to run the API integration"""
-    api = APIIntegration()
-    
+    args = parse_args()
+    async with APIIntegration(use_cache=not args.no_cache) as api:
+        try:
+            await run(api)
+        finally:
+            api.display_metrics(api.metrics_snapshot())
+
+async def run(api):
+    """Run the dashboard and interactive loop against an open APIIntegration"""
     print("🚀 API Integration Script")
     print("Fetching data from external APIs...")
     
-    # Fetch weather data
-    city = input("\nEnter city name for weather data (e.g., London, New York): ").strip()
-    if city:
-        weather_data = api.fetch_weather_data(city)
-        api.display_weather(weather_data)
+    cities = parse_cities(input("\nEnter city name(s) for weather data, comma-separated (e.g., London, Paris): "))
     
-    # Fetch crypto prices
-    print("\nFetching cryptocurrency prices...")
+    # Fetch weather and crypto prices concurrently
+    print("\nFetching weather and cryptocurrency prices...")
     crypto_symbols = ['bitcoin', 'ethereum', 'cardano', 'solana']
-    crypto_data = api.fetch_crypto_prices(crypto_symbols)
+    weather_batch, crypto_data = await asyncio.gather(
+        api.fetch_weather_many(cities),
+        api.fetch_crypto_prices(crypto_symbols)
+    )
+    for weather_data in weather_batch.values():
+        api.display_weather(weather_data)
     api.display_crypto_prices(crypto_data)
     
     # Interactive mode
     while True:
         print("\n" + "="*50)
         print("Choose an option:")
-        print("1. Check weather for another city")
+        print("1. Check weather for other cities (comma-separated)")
         print("2. Check specific cryptocurrency")
         print("3. Exit")
         
         choice = input("Enter your choice (1/2/3): ").strip()
         
         if choice == '1':
-            city = input("Enter city name: ").strip()
-            if city:
-                weather_data = api.fetch_weather_data(city)
+            cities = parse_cities(input("Enter city name(s): "))
+            if len(cities) == 1:
+                weather_data = await api.fetch_weather_data(cities[0])
                 api.display_weather(weather_data)
+            elif cities:
+                weather_batch = await api.fetch_weather_many(cities)
+                for weather_data in weather_batch.values():
+                    api.display_weather(weather_data)
         
         elif choice == '2':
             crypto = input("Enter cryptocurrency name (e.g., bitcoin, ethereum): ").strip().lower()
             if crypto:
-                crypto_data = api.fetch_crypto_prices([crypto])
+                crypto_data = await api.fetch_crypto_prices([crypto])
                 api.display_crypto_prices(crypto_data)
         
         elif choice == '3':
@@ -205,4 +888,12 @@ def main():
             print("Invalid choice. Please try again.")
 
 if __name__ == "__main__":
-    main()
+    if uvloop is not None and sys.platform != 'win32':
+        if hasattr(uvloop, 'run'):
+            uvloop.run(main())
+        else:
+            # uvloop before 0.18 has no run(); install its policy instead
+            uvloop.install()
+            asyncio.run(main())
+    else:
+        asyncio.run(main())
@@ -0,0 +1,295 @@
+import asyncio
+import io
+import socket
+import time
+import unittest
+from unittest import mock
+
+import httpx
+
+from APIIntegration import (APIIntegration, Bulkhead, BulkheadFullError, CallMetrics, CircuitOpenError,
+                            DNSCache)
+
+
+class MockAPITestCase(unittest.IsolatedAsyncioTestCase):
+    def mock_api(self, handler, **kwargs):
+        """Return an APIIntegration whose client is served by handler instead of the network"""
+        api = APIIntegration(use_cache=False, **kwargs)
+        api._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        self.addAsyncCleanup(api.aclose)
+        return api
+
+
+class DNSCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.resolver = mock.Mock(return_value=[('answer',)])
+        self.dns_cache = DNSCache(['api.coingecko.com'])
+        patcher = mock.patch.object(socket, 'getaddrinfo', self.resolver)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.dns_cache.install()
+        self.addCleanup(self.dns_cache.uninstall)
+
+    def test_bytes_hostname_hits_cache(self):
+        # anyio hands the hostname to getaddrinfo IDNA-encoded as bytes
+        for _ in range(3):
+            answer = socket.getaddrinfo(b'api.coingecko.com', 443, type=socket.SOCK_STREAM)
+        self.assertEqual(answer, [('answer',)])
+        self.assertEqual(self.resolver.call_count, 1)
+
+    def test_invalidate_accepts_bytes(self):
+        socket.getaddrinfo(b'api.coingecko.com', 443)
+        self.dns_cache.invalidate(b'api.coingecko.com')
+        socket.getaddrinfo('api.coingecko.com', 443)
+        self.assertEqual(self.resolver.call_count, 2)
+
+    def test_other_hosts_pass_through(self):
+        socket.getaddrinfo(b'example.com', 443)
+        socket.getaddrinfo(b'example.com', 443)
+        self.assertEqual(self.resolver.call_count, 2)
+
+    def test_install_is_reference_counted(self):
+        self.dns_cache.install()
+        self.dns_cache.uninstall()
+        self.assertEqual(socket.getaddrinfo, self.dns_cache.getaddrinfo)
+        self.dns_cache.uninstall()
+        self.assertIs(socket.getaddrinfo, self.resolver)
+
+    def test_second_cache_cannot_install(self):
+        with self.assertRaises(RuntimeError):
+            DNSCache(['api.openweathermap.org']).install()
+
+
+class RetryTest(MockAPITestCase):
+    def setUp(self):
+        self.sleep = mock.AsyncMock()
+        for patcher in (mock.patch('asyncio.sleep', self.sleep),
+                        mock.patch('random.uniform', return_value=0)):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    async def request(self, *outcomes):
+        """Send one request against an upstream that yields outcomes in turn"""
+        outcomes = iter(outcomes)
+        self.calls = 0
+
+        def handler(request):
+            self.calls += 1
+            outcome = next(outcomes)
+            if isinstance(outcome, Exception):
+                raise outcome
+            return outcome
+
+        api = self.mock_api(handler)
+        return await api._request_with_retry('GET', 'https://api.coingecko.com/x',
+                                             deadline=time.monotonic() + 60)
+
+    async def test_retries_server_error(self):
+        response = await self.request(httpx.Response(503), httpx.Response(200))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.calls, 2)
+
+    async def test_retries_timeout(self):
+        response = await self.request(httpx.ReadTimeout("slow"), httpx.Response(200))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.calls, 2)
+
+    async def test_does_not_retry_client_error(self):
+        response = await self.request(httpx.Response(404), httpx.Response(200))
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(self.calls, 1)
+
+    async def test_honours_retry_after(self):
+        await self.request(httpx.Response(429, headers={'Retry-After': '3'}), httpx.Response(200))
+        self.sleep.assert_awaited_once_with(3)
+
+    async def test_caps_retry_after(self):
+        await self.request(httpx.Response(429, headers={'Retry-After': '120'}), httpx.Response(200))
+        self.sleep.assert_awaited_once_with(8.0)
+
+    async def test_returns_last_response_when_attempts_run_out(self):
+        response = await self.request(*(httpx.Response(503, text=str(i)) for i in range(4)))
+        self.assertEqual(response.text, '3')
+        self.assertEqual(self.calls, 4)
+
+    async def test_raises_last_exception_when_attempts_run_out(self):
+        errors = [httpx.ConnectError(str(i)) for i in range(4)]
+        with self.assertRaises(httpx.ConnectError) as raised:
+            await self.request(*errors)
+        self.assertIs(raised.exception, errors[-1])
+
+
+class CircuitBreakerTest(MockAPITestCase):
+    def setUp(self):
+        self.status = 503
+        self.calls = 0
+        # Set to an Event to make the upstream hang after signalling it
+        self.stalled = None
+        self.api = self.mock_api(self.handler)
+        self.breaker = self.api._breakers['crypto']
+        # Backoff sleeps are not under test here
+        for patcher in (mock.patch('asyncio.sleep', mock.AsyncMock()),
+                        mock.patch('random.uniform', return_value=0)):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    async def handler(self, request):
+        self.calls += 1
+        if self.stalled is not None:
+            self.stalled.set()
+            await asyncio.Event().wait()
+        return httpx.Response(self.status, json={'bitcoin': {'usd': 1.0}})
+
+    async def request(self):
+        return await self.api._guarded_request('crypto', 'GET', 'https://api.coingecko.com/x',
+                                               deadline=time.monotonic() + 5)
+
+    async def open_breaker(self):
+        for _ in range(self.breaker.failure_threshold):
+            await self.request()
+        self.breaker.opened_at -= self.breaker.recovery_timeout
+
+    async def test_opens_after_threshold_failures(self):
+        for _ in range(4):
+            await self.request()
+        self.assertEqual(self.breaker.state, 'CLOSED')
+        await self.request()
+        self.assertEqual(self.breaker.state, 'OPEN')
+
+    async def test_open_breaker_refuses_and_serves_stale_cache(self):
+        await self.open_breaker()
+        self.breaker.opened_at = time.monotonic()
+        self.api._crypto_cache.set(('bitcoin',), {'bitcoin': 'stale'}, ttl=-1)
+        calls = self.calls
+        with self.assertRaises(CircuitOpenError):
+            await self.request()
+        with mock.patch('sys.stdout', io.StringIO()):
+            self.assertEqual(await self.api.fetch_crypto_prices(['bitcoin']), {'bitcoin': 'stale'})
+        self.assertEqual(self.calls, calls)
+
+    async def test_lets_one_probe_through_after_recovery_timeout(self):
+        await self.open_breaker()
+        self.assertTrue(self.breaker.allow_request())
+        self.assertEqual(self.breaker.state, 'HALF_OPEN')
+        self.assertFalse(self.breaker.allow_request())
+
+    async def test_successful_probe_closes(self):
+        await self.open_breaker()
+        self.status = 200
+        await self.request()
+        self.assertEqual(self.breaker.state, 'CLOSED')
+        self.assertEqual(self.breaker.failure_count, 0)
+
+    async def test_failed_probe_reopens(self):
+        await self.open_breaker()
+        calls = self.calls
+        await self.request()
+        self.assertEqual(self.breaker.state, 'OPEN')
+        self.assertGreater(self.calls, calls)
+        with self.assertRaises(CircuitOpenError):
+            await self.request()
+
+    async def test_cancelled_probe_reopens_without_counting(self):
+        await self.open_breaker()
+        failures = self.breaker.failure_count
+        self.stalled = asyncio.Event()
+        probe = asyncio.create_task(self.request())
+        await self.stalled.wait()
+        self.assertEqual(self.breaker.state, 'HALF_OPEN')
+        probe.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await probe
+        self.assertEqual(self.breaker.state, 'OPEN')
+        self.assertEqual(self.breaker.failure_count, failures)
+
+
+class BulkheadTest(unittest.IsolatedAsyncioTestCase):
+    async def run_stalled(self, callers, bulkhead):
+        """Start callers that each hold a slot until released; return the release event and tasks"""
+        release = asyncio.Event()
+
+        async def stalled():
+            async with bulkhead:
+                await release.wait()
+
+        tasks = [asyncio.create_task(stalled()) for _ in range(callers)]
+        # Let every caller reach the semaphore
+        await asyncio.sleep(0.01)
+        return release, tasks
+
+    async def test_extra_callers_wait_for_a_slot(self):
+        bulkhead = Bulkhead(8, queue_timeout=5)
+        release, tasks = await self.run_stalled(9, bulkhead)
+        self.assertEqual(bulkhead.stats(), {'in_flight': 8, 'queued': 1, 'rejected': 0})
+        release.set()
+        await asyncio.gather(*tasks)
+        self.assertEqual(bulkhead.stats(), {'in_flight': 0, 'queued': 0, 'rejected': 0})
+
+    async def test_rejects_after_queue_timeout(self):
+        bulkhead = Bulkhead(8, queue_timeout=0.05)
+        release, tasks = await self.run_stalled(10, bulkhead)
+        await asyncio.sleep(0.1)
+        self.assertEqual(bulkhead.stats(), {'in_flight': 8, 'queued': 0, 'rejected': 2})
+        release.set()
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+        self.assertEqual(sum(isinstance(result, BulkheadFullError) for result in results), 2)
+
+
+class CryptoOrderTest(MockAPITestCase):
+    async def test_prices_follow_requested_order(self):
+        def handler(request):
+            return httpx.Response(200, json={'cardano': {'usd': 0.5}, 'bitcoin': {'usd': 1.0},
+                                             'ethereum': {'usd': 2.0}})
+
+        api = self.mock_api(handler)
+        symbols = ['ethereum', 'bitcoin', 'cardano']
+        self.assertEqual(list(await api.fetch_crypto_prices(symbols)), symbols)
+
+
+class DNSPinningTest(unittest.IsolatedAsyncioTestCase):
+    async def test_overlapping_instances_share_the_patch(self):
+        real_getaddrinfo = socket.getaddrinfo
+        first, second = APIIntegration(use_cache=False), APIIntegration(use_cache=False)
+        await first.__aenter__()
+        await second.__aenter__()
+        await first.aclose()
+        self.assertNotEqual(socket.getaddrinfo, real_getaddrinfo)
+        await second.aclose()
+        self.assertIs(socket.getaddrinfo, real_getaddrinfo)
+
+
+class DisplayMetricsTest(unittest.TestCase):
+    def test_host_without_latencies(self):
+        out = io.StringIO()
+        with mock.patch('sys.stdout', out):
+            APIIntegration(use_cache=False).display_metrics({'api.coingecko.com': CallMetrics().snapshot()})
+        self.assertIn("Latency p50/p95/p99: n/a / n/a / n/a ms", out.getvalue())
+
+
+class DeadlineTest(MockAPITestCase):
+    async def test_slow_attempt_leaves_budget_for_retry(self):
+        calls = []
+
+        async def drip():
+            while True:
+                yield b' '
+                await asyncio.sleep(0.05)
+
+        def handler(request):
+            calls.append(request)
+            if len(calls) == 1:
+                return httpx.Response(200, content=drip())
+            return httpx.Response(200, json={})
+
+        api = self.mock_api(handler)
+        started = time.monotonic()
+        with mock.patch('random.uniform', return_value=0):
+            response = await api._request_with_retry('GET', 'https://api.coingecko.com/x',
+                                                     deadline=started + 2.0, per_try_timeout=0.2)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(calls), 2)
+        self.assertLess(time.monotonic() - started, 1.0)
+
+
+if __name__ == '__main__':
+    unittest.main()